@@ -1,3 +1,4 @@
+import numpy
 import pandas
 
 try:
@@ -29,36 +30,30 @@ class SortGenotypeTableWorkflow:
 	@staticmethod
 	def _build_sorted_frequency_table(original_frequencies: pandas.DataFrame, thresholds: pandas.DataFrame) -> pandas.DataFrame:
 		# Sort genotypes based on frequency if two or more share the same fixed timepoint, detection timpoint, threshold timepoint.
-		# Iterate over the conbinations of 'firstFixed', 'firstDetected', and 'firstThreshold' and sort trajectories that belong to the sample combination.
-		# Need to build a new trajectory table based on the sorted timepoint table.
-
-		freq_groups = list()
-		# Group the
-		groups = thresholds.groupby(by = list(thresholds.columns))
-		for (ff, fd, ft), group in groups:
-			# Each group will look like this:
-			#   	firstFixed firstDetected firstThreshold
-			# 15          0            25              0
-			# 10          0            25              0
-			# if ft == 130:  # dummy value assigned above. Revert back to 0 since '130' isn't a valid timepoint.
-			#	ft = 0
-			# Get a table of the original frequencies at each timepoint for the genotypes present in `group`
-			trajectories: pandas.DataFrame = original_frequencies.loc[group.index]
-			if len(group) < 2:
-				# There is only one genotype in this combination of timepoints. No need to sort.
-				freq_groups.append(trajectories)
-			else:
-				# More than one genotype share this combination of key timepoints. Sort by frequency.
-				# Sort from highest to lowest using the timpoint columns as the sorting keys.
-				# trajectories = trajectories.sort_values(by = [ff, ft, fd], ascending = False)
-				trajectories = trajectories.sort_values(by = [fd, ft, ff], ascending = False)
-				freq_groups.append(trajectories)
-
-		try:
-			freq_df = pandas.concat(freq_groups)
-		except ValueError:
-			# Can't concatenate an empty dataframe
-			freq_df = None
+		# Rather than iterating over each combination of 'firstDetected', 'firstFixed', and 'firstThreshold' and sorting the genotypes
+		# in each group separately, sort the whole table at once using the key timepoints followed by each genotype's frequency at those timepoints.
+		# Genotypes missing any of the key timepoints are excluded, same as when grouping them.
+		thresholds = thresholds.dropna()
+		if thresholds.empty:
+			# There were no genotypes to sort.
+			return None
+		first_detected, first_fixed, first_threshold = [thresholds[column].values for column in thresholds.columns]
+
+		# Each genotype's frequency at its own key timepoints.
+		frequencies = original_frequencies.loc[thresholds.index]
+		rows = numpy.arange(len(frequencies))
+		frequency_detected, frequency_fixed, frequency_threshold = [
+			frequencies.values[rows, frequencies.columns.get_indexer(timepoints)]
+			for timepoints in (first_detected, first_fixed, first_threshold)
+		]
+
+		# `numpy.lexsort` uses the last key as the primary key and is stable, so genotypes with identical keys keep their current order.
+		# Genotypes are sorted by key timepoints in ascending order, then by frequency at those timepoints from highest to lowest.
+		order = numpy.lexsort((
+			-frequency_detected, -frequency_threshold, -frequency_fixed,
+			first_threshold, first_fixed, first_detected
+		))
+		freq_df = frequencies.iloc[order]
 
 		return freq_df
 
@@ -2,6 +2,7 @@ import itertools
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
+import numpy
 import pandas
 from scipy.spatial import distance
 
@@ -41,14 +42,19 @@ class DistanceCache:
 		""" Converts a dictionary with all pairwise values for a set of points into a square matrix representation.
 		"""
 		keys = sorted(set(itertools.chain.from_iterable(self.pairwise_values.keys())))
-		_square_map = dict()
-		for left in keys:
-			series = dict()
-			for right in keys:
-				value = self.get(left, right, 0)
-				series[right] = value
-			_square_map[left] = series
-		return pandas.DataFrame(_square_map)
+		positions = {key: position for position, key in enumerate(keys)}
+		total = len(self.pairwise_values)
+		left_positions = numpy.fromiter((positions[left] for left, _ in self.pairwise_values), dtype = numpy.intp, count = total)
+		right_positions = numpy.fromiter((positions[right] for _, right in self.pairwise_values), dtype = numpy.intp, count = total)
+		values = numpy.fromiter(self.pairwise_values.values(), dtype = float, count = total)
+
+		# Missing pairs default to 0. The transposed fill is applied last, so each cell is `self.get(column, row)`. If both
+		# orientations of a pair are cached with different values, the row holds `self.pairwise_values[column, row]`.
+		# This reproduces the layout of the original `pandas.DataFrame(dict_of_dicts)` table, which was keyed by column first.
+		matrix = numpy.zeros((len(keys), len(keys)))
+		matrix[left_positions, right_positions] = values
+		matrix[right_positions, left_positions] = values
+		return pandas.DataFrame(matrix, index = keys, columns = keys)
 
 	def triangle(self):
 		""" Returns the condensed squareform of the pair array."""
@@ -90,11 +96,9 @@ class DistanceCache:
 				yield key
 
 	def save(self, filename: Path):
-		with filename.open('w') as output:
-			for key in self.unique():
-				value = self.get(*key)
-				line = f"{key[0]}\t{key[1]}\t{value}\n"
-				output.write(line)
+		# Format every line first and write the file in a single call.
+		lines = [f"{left}\t{right}\t{self.get(left, right)}\n" for left, right in self.unique()]
+		filename.write_text("".join(lines))
 
 	@property
 	def values(self)->List[float]:
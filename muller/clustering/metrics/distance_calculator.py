@@ -1,7 +1,9 @@
+import functools
 import math
 import multiprocessing
 from typing import Dict, Generator, List, Optional, Tuple
 
+import numpy
 import pandas
 from loguru import logger
 from tqdm import tqdm
@@ -14,6 +16,8 @@ except ModuleNotFoundError:
 	from ... import widgets
 
 FilterType = Tuple[Optional[pandas.Series], Optional[pandas.Series]]
+# The detection masks for a single trajectory, including and excluding fixed timepoints. See `widgets.get_detection_mask()`.
+MaskType = Tuple[numpy.ndarray, numpy.ndarray]
 
 
 class DistanceCalculator:
@@ -29,18 +33,47 @@ class DistanceCalculator:
 
 		self.progress_bar_minimum_points = 10000  # The value to activate the scale bar at.
 
+	def get_all_trajectory_dynamics(self) -> Dict[str, Tuple[bool, bool]]:
+		"""
+			Summarizes each trajectory once so that the pair categories don't have to re-scan both trajectories for every pair.
+			Every trajectory is tested at once using the full table. Matches `get_trajectory_dynamics()`.
+		"""
+		values = self.trajectories.to_numpy()
+		was_fixed = widgets.get_fixed_mask(values, self.fixed_limit).any(axis = 1)
+		has_intermediate = widgets.get_intermediate_mask(values, self.detection_limit, self.fixed_limit).any(axis = 1)
+		return dict(zip(self.trajectories.index, zip(was_fixed.tolist(), has_intermediate.tolist())))
+
+	def get_detection_masks(self) -> Dict[str, MaskType]:
+		""" Compares every trajectory against the detection limit once rather than once for each pair it belongs to."""
+		values = self.trajectories.to_numpy()
+		detected = widgets.get_detection_mask(values, self.detection_limit, exclude_fixed = False)
+		# `get_valid_points()` always uses `widgets.DETECTION_MASK_FIXED_LIMIT` rather than `self.fixed_limit` to exclude fixed values.
+		detected_not_fixed = widgets.get_detection_mask(values, self.detection_limit, exclude_fixed = True)
+		return {
+			label: (label_detected, label_detected_not_fixed)
+			for label, label_detected, label_detected_not_fixed in zip(self.trajectories.index, detected, detected_not_fixed)
+		}
+
 	def calculate_pairwise_distances_threaded(self, pair_combinations: Generator, total: Optional[int] = None) -> Dict[
 		Tuple[str, str], float]:
 		""" Threaded version of the pairwise distance calculator"""
 		pair_array: Dict[Tuple[str, str], float] = dict()
 		progress_bar = tqdm(total = total)
-		pool = multiprocessing.Pool(processes = self.threads)
-		for i in tqdm(
-				[pool.apply_async(calculate_distance, args = (self, e, self.trajectories)) for e in pair_combinations]):
-			key, value = i.get()  # retrieve the calculated value
-			pair_array[key] = value
-			pair_array[key[::-1]] = value
-			progress_bar.update(1)
+		trajectory_rows = get_trajectory_rows(self.trajectories)
+		calculate = functools.partial(
+			calculate_distance, self,
+			trajectories = trajectory_rows,
+			dynamics = self.get_all_trajectory_dynamics(),
+			masks = self.get_detection_masks()
+		)
+		# Send the pairs to the workers in large chunks. Each task has to serialize the trajectories, so submitting
+		# one task per pair spends most of the time copying data rather than calculating distances.
+		chunksize = max(1, (total or 0) // (4 * self.threads))
+		with multiprocessing.Pool(processes = self.threads) as pool:
+			for key, value in pool.imap(calculate, pair_combinations, chunksize = chunksize):
+				pair_array[key] = value
+				pair_array[key[::-1]] = value
+				progress_bar.update(1)
 
 		return pair_array
 
@@ -55,8 +88,11 @@ class DistanceCalculator:
 		if use_progressbar:
 			progress_bar = tqdm(total = total)
 
+		trajectory_rows = get_trajectory_rows(self.trajectories)
+		trajectory_dynamics = self.get_all_trajectory_dynamics()
+		trajectory_masks = self.get_detection_masks()
 		for element in pair_combinations:
-			key, value = calculate_distance(self, element, self.trajectories)
+			key, value = calculate_distance(self, element, trajectory_rows, trajectory_dynamics, trajectory_masks)
 			pair_array[key] = value
 			pair_array[key[1], key[
 				0]] = value  # It's faster to add the reverse key rather than trying trying to get  test forward and reverse keys
@@ -128,91 +164,82 @@ class DistanceCalculator:
 		return pairwise_distances
 
 
-def get_pair_category(left: pandas.Series, right: pandas.Series, dlimit: float, flimit: float) -> str:
+def get_trajectory_dynamics(trajectory: pandas.Series, dlimit: float, flimit: float) -> Tuple[bool, bool]:
 	"""
-		Categorizes the pair of mutational trajectories based on the dynamics of the
-		measured frequencies over time.
-		Each pair of mutational trajectories can be categorized into one of the following groups:
-		- "onlyFixed": Both trajectories were only detected during timepoints where they were fixed.
-		- "PartiallyFixed":Both trajectories were fixed, but only one trajectory was fixed during all timepoints where it was detected.
-		- "bothFixed": Both trajectories where fixed during at least one sampled timepoint, and both had intermediate values.
-		- "oneFixed": Only one of the trajectories was fixed.
-		- "notFixed: Neither trajectory where fixed at any of the sampled timepoints.
+		Summarizes the parts of a trajectory needed to categorize it against other trajectories. These only depend on the
+		trajectory itself, so they can be calculated once per trajectory rather than once for every pair.
 	Returns
 	-------
-	str
-		- 'onlyFixed': Both trajectories were only detected after they fixed.
-		- 'partiallyFixed': Only one trajectory had intermediate values.
-		- 'bothFixed': Both trajectories had non-fixed timepoints.
-		- 'oneFixed': Only one trajectory ever fixed.
-		- 'notFixed': Neither trajectory was ever fixed.
+	Tuple[bool, bool]
+		- Whether the trajectory was fixed at any timepoint.
+		- Whether the trajectory had any intermediate values between the detection limit and the fixed limit.
 	"""
-	fixed_left = widgets.get_fixed(left, flimit)
-	fixed_right = widgets.get_fixed(right, flimit)
-
-	left_was_fixed = len(fixed_left) > 0
-	right_was_fixed = len(fixed_right)
+	was_fixed = len(widgets.get_fixed(trajectory, flimit)) > 0
 	# Check if there are any intermediate values between the detection limit and the fixed limit.
-	intermediate_left = widgets.get_intermediate(left, dlimit, flimit)
-	intermediate_right = widgets.get_intermediate(right, dlimit, flimit)
+	has_intermediate = not widgets.get_intermediate(trajectory, dlimit, flimit).empty
+	return was_fixed, has_intermediate
+
 
-	#undetected_left = widgets.get_undetected(left, dlimit)
-	#undetected_right = widgets.get_undetected(right, dlimit)
+def _categorize_dynamics(left_dynamics: Tuple[bool, bool], right_dynamics: Tuple[bool, bool]) -> str:
+	""" Categorizes a pair of trajectories based on the output of `get_trajectory_dynamics()` for each one. See `get_pair_category()`."""
+	left_was_fixed, left_has_intermediate = left_dynamics
+	right_was_fixed, right_has_intermediate = right_dynamics
 
 	if left_was_fixed and right_was_fixed:
 		# If both of these fixed at some point, the regions where they're both fixed means they should be
 		# included within the same genotype. If, however, they both are both fixed but at separate timepoints,
 		# They probably shouldn't be grouped together. It is also possible for one to be fixed and the other to
 		# be only fixed.
-		left_was_only_fixed = intermediate_left.empty
-		right_was_only_fixed = intermediate_right.empty
-
-		if left_was_only_fixed and right_was_only_fixed:
+		if not left_has_intermediate and not right_has_intermediate:
 			# Both series only have undetected or fixed values
 			category = 'onlyFixed'
-		elif not left_was_only_fixed and not right_was_only_fixed:
+		elif left_has_intermediate and right_has_intermediate:
 			# Both series had intermediate values
 			category = 'bothFixed'
 		else:
 			# One series only had fixed timepoints, the other did not.
 			category = 'partiallyFixed'
-
-		# So, check if the 'fixed' regions overlap.
-		# left_reduced, right_reduced = widgets.get_valid_points(left_trajectory, right_trajectory, process.detection_limit, process.fixed_limit,
-		#	inner = False)
-		overlapping_regions = widgets.get_overlap_regions(left, right, flimit)
-		# Need to make sure there aren't any regions after the first timepoint where both are fixed that is not fixed
-		first_overlap_timepoint = widgets.get_first_fixed_timepoint(overlapping_regions, flimit)
-		# Now get the section of the series after the first fixed timepoint for both series.
-		overlapping_regions_after_fixed: pandas.Series = overlapping_regions[first_overlap_timepoint:]
-		# Are there any timepoints after this where they aren't both overlapping?
-		nonfixed_regions_after_first = overlapping_regions.apply(lambda s: s < 0.97)
-		# If there is no subsequent timepoint that is not fixed or the overlapping regions after fixed is empty
-		# Then these should be grouped together, but still need to check if the nonfixed regions agree.
-		#is_genotype = overlapping_regions_after_fixed.empty or nonfixed_regions_after_first.sum() == 0
-
 	# Check if the number of timepoints that overlap is more than one (overlapping suring one timepoint may be
 	# due to measurement error.
-	elif (left_was_fixed and not right_was_fixed) or (not left_was_fixed and right_was_fixed):
+	elif left_was_fixed or right_was_fixed:
 		# Only one trajectory had fixed timepoints
 		category = 'oneFixed'
-	elif not left_was_fixed and not right_was_fixed:
+	else:
 		# Neither series had fixed values.
 		category = 'notFixed'
-	else:
-		message = f"Could not determine the category of this mutational pair"
-		logger.error(message)
-		logger.error(left)
-		logger.error(right)
-		raise ValueError
-
 	return category
 
 
+def get_pair_category(left: pandas.Series, right: pandas.Series, dlimit: float, flimit: float) -> str:
+	"""
+		Categorizes the pair of mutational trajectories based on the dynamics of the
+		measured frequencies over time.
+		Each pair of mutational trajectories can be categorized into one of the following groups:
+		- "onlyFixed": Both trajectories were only detected during timepoints where they were fixed.
+		- "PartiallyFixed":Both trajectories were fixed, but only one trajectory was fixed during all timepoints where it was detected.
+		- "bothFixed": Both trajectories where fixed during at least one sampled timepoint, and both had intermediate values.
+		- "oneFixed": Only one of the trajectories was fixed.
+		- "notFixed: Neither trajectory where fixed at any of the sampled timepoints.
+	Returns
+	-------
+	str
+		- 'onlyFixed': Both trajectories were only detected after they fixed.
+		- 'partiallyFixed': Only one trajectory had intermediate values.
+		- 'bothFixed': Both trajectories had non-fixed timepoints.
+		- 'oneFixed': Only one trajectory ever fixed.
+		- 'notFixed': Neither trajectory was ever fixed.
+	"""
+	left_dynamics = get_trajectory_dynamics(left, dlimit, flimit)
+	right_dynamics = get_trajectory_dynamics(right, dlimit, flimit)
+	return _categorize_dynamics(left_dynamics, right_dynamics)
+
+
 def filter_timepoints(left_trajectory: pandas.Series, right_trajectory: pandas.Series, dlimit: float,
-		flimit: float) -> FilterType:
+		flimit: float, pair_category: Optional[str] = None, masks: Optional[Tuple[MaskType, MaskType]] = None) -> FilterType:
 	"""
 		Filters the available timepoints based on the measured dynamics.
+		`pair_category` can be given if the category of the pair is already known. See `get_pair_category()`.
+		`masks` can be given if the detection masks of both trajectories were already calculated. See `DistanceCalculator.get_detection_masks()`.
 	"""
 	"""
 	Legacy code:
@@ -224,10 +251,11 @@ def filter_timepoints(left_trajectory: pandas.Series, right_trajectory: pandas.S
 
 	
 	"""
-	pair_category = get_pair_category(
-		left_trajectory, right_trajectory,
-		dlimit = dlimit, flimit = flimit
-	)
+	if pair_category is None:
+		pair_category = get_pair_category(
+			left_trajectory, right_trajectory,
+			dlimit = dlimit, flimit = flimit
+		)
 	if pair_category == 'onlyFixed':
 		left_reduced = right_reduced = None
 
@@ -235,25 +263,25 @@ def filter_timepoints(left_trajectory: pandas.Series, right_trajectory: pandas.S
 		# There is no overlap between these series so we have to rely on the overlap between "fixed" regions.
 		left_reduced, right_reduced = widgets.get_valid_points(
 			left_trajectory, right_trajectory,
-			dlimit = dlimit, flimit = flimit, inner = False
+			dlimit = dlimit, flimit = flimit, inner = False, masks = _select_masks(masks, exclude_fixed = True)
 		)
 
 	elif pair_category == 'oneFixed':
 		left_reduced, right_reduced = widgets.get_valid_points(
 			left_trajectory, right_trajectory,
-			dlimit = dlimit, inner = False
+			dlimit = dlimit, inner = False, masks = _select_masks(masks, exclude_fixed = False)
 		)
 	elif pair_category == 'notFixed':
 		left_reduced, right_reduced = widgets.get_valid_points(
 			left_trajectory, right_trajectory,
 			dlimit = dlimit, flimit = flimit,
-			inner = False
+			inner = False, masks = _select_masks(masks, exclude_fixed = True)
 		)
 	elif pair_category == 'bothFixed':
 		left_reduced, right_reduced = widgets.get_valid_points(
 			left_trajectory, right_trajectory,
 			dlimit = dlimit, flimit=flimit,
-			inner = False
+			inner = False, masks = _select_masks(masks, exclude_fixed = True)
 		)
 	else:
 		message = f"Got an invalid category for a pair of trajectories: '{pair_category}'"
@@ -264,22 +292,58 @@ def filter_timepoints(left_trajectory: pandas.Series, right_trajectory: pandas.S
 	return left_reduced, right_reduced
 
 
+def _select_masks(masks: Optional[Tuple[MaskType, MaskType]], exclude_fixed: bool) -> Optional[Tuple[numpy.ndarray, numpy.ndarray]]:
+	""" Selects the detection mask of each trajectory that corresponds to whether `flimit` is passed to `widgets.get_valid_points()`."""
+	if masks is None:
+		return None
+	left_masks, right_masks = masks
+	return left_masks[exclude_fixed], right_masks[exclude_fixed]
+
+
+def get_trajectory_rows(trajectories: pandas.DataFrame) -> Dict[str, pandas.Series]:
+	""" Splits the trajectory table into one series per trajectory. Each trajectory is compared against every other trajectory,
+		so it's much faster to extract each row once rather than calling `.loc[]` twice for every pair.
+	"""
+	return {label: trajectory for label, trajectory in trajectories.iterrows()}
+
+
 # Keep this as a separate function. Class methods are finicky when used with multiprocessing.
-def calculate_distance(process: DistanceCalculator, element: Tuple[str, str], trajectories: pandas.DataFrame) -> Tuple[
-	Tuple[str, str], float]:
+def calculate_distance(process: DistanceCalculator, element: Tuple[str, str], trajectories: Dict[str, pandas.Series],
+		dynamics: Optional[Dict[str, Tuple[bool, bool]]] = None, masks: Optional[Dict[str, MaskType]] = None) -> Tuple[Tuple[str, str], float]:
 	""" Implements the actual calculation for a specific pair of trajectories.
 		It should be atomitized so that it works with multithreading.
+	Parameters
+	----------
+	process: DistanceCalculator
+	element: Tuple[str, str]
+		The labels of the two trajectories to compare.
+	trajectories: Dict[str, pandas.Series]
+		Maps each trajectory label to its series. See `get_trajectory_rows()`.
+	dynamics: Optional[Dict[str, Tuple[bool, bool]]]
+		Maps each trajectory label to its summary from `get_trajectory_dynamics()`. Calculated from the trajectories if not given.
+	masks: Optional[Dict[str, MaskType]]
+		Maps each trajectory label to its detection masks. See `DistanceCalculator.get_detection_masks()`.
 	"""
 	left, right = element
-	left_trajectory = trajectories.loc[left]
-	right_trajectory = trajectories.loc[right]
+	left_trajectory = trajectories[left]
+	right_trajectory = trajectories[right]
 
 	# We only care about the timepoints such that `detection_cutoff` < f < `fixed_cutoff`.
 	# For now, lets require that both timepoints are detected and not yet fixed.
 	# There is an issue related to comparing fixed genotypes against non-fixed genotypes.
 
+	if dynamics is None:
+		pair_category = None
+	else:
+		pair_category = _categorize_dynamics(dynamics[left], dynamics[right])
+
+	if masks is None:
+		pair_masks = None
+	else:
+		pair_masks = masks[left], masks[right]
+
 	left_reduced, right_reduced = filter_timepoints(
-		left_trajectory, right_trajectory, process.detection_limit, process.fixed_limit
+		left_trajectory, right_trajectory, process.detection_limit, process.fixed_limit, pair_category, pair_masks
 	)
 
 	if left_reduced is None or right_reduced is None:
@@ -1,5 +1,6 @@
 import math
 
+import numpy
 import pandas
 from loguru import logger
 
@@ -39,7 +40,24 @@ def pearson_correlation_distance(left: pandas.Series, right: pandas.Series, adju
 	float
 	"""
 
-	pcc = left.corr(right, method = 'pearson')
+	# Equivalent to `left.corr(right)`, but works on the underlying arrays since this is evaluated for every pair of trajectories.
+	left_values = left.values.astype(float)
+	right_values = right.values.astype(float)
+	# Only use timepoints where both series have a value.
+	is_valid = ~(numpy.isnan(left_values) | numpy.isnan(right_values))
+	left_values = left_values[is_valid]
+	right_values = right_values[is_valid]
+	if len(left_values) < 2:
+		pcc = math.nan
+	else:
+		left_centered = left_values - left_values.mean()
+		right_centered = right_values - right_values.mean()
+		variance_product = numpy.dot(left_centered, left_centered) * numpy.dot(right_centered, right_centered)
+		# Series with no variance have an undefined correlation.
+		pcc = numpy.dot(left_centered, right_centered) / math.sqrt(variance_product) if variance_product else math.nan
+		# Rounding can push perfectly correlated series slightly past 1, which would make the distance negative.
+		# `numpy.corrcoef` and `pandas.Series.corr` clip the coefficient as well.
+		pcc = float(numpy.clip(pcc, -1.0, 1.0))
 	# Adjust due to sample size
 	if adjusted:
 		adjusted_pcc = adjust_correlation_coefficient(pcc, len(left))
@@ -58,25 +76,26 @@ def adjust_correlation_coefficient(r: float, n: int) -> float:
 # noinspection PyTypeChecker
 def binomial_distance(left: pandas.Series, right: pandas.Series) -> float:
 	""" Based on the binomial calculations present in the original matlab scripts."""
-	# Find the mean frequency of each timepoint
-	# index is timepoints,  values are frequencies
-	not_detected_fixed_df = pandas.concat([left, right], axis = 1)
-	mean: pandas.Series = not_detected_fixed_df.mean(axis = 1)
+	# This is evaluated for every pair of trajectories, so work with the underlying arrays rather than building a dataframe for each pair.
+	# Both series are assumed to share the same index.
+	frequencies = numpy.vstack([left.values, right.values]).astype(float)
+	is_missing = numpy.isnan(frequencies)
+	# Find the mean frequency of each timepoint, ignoring missing values.
+	with numpy.errstate(invalid = 'ignore'):
+		mean = numpy.where(is_missing, 0, frequencies).sum(axis = 0) / (~is_missing).sum(axis = 0)
 
 	# Calculate sigma_freq
 	# E(sigma) = (1/n) sum(sigma) = (1/n) sum(np(1-p)) == sum(p(1-p)
 	# E(sigma_p) = (1/n) E(sigma) == 1/n(sum(p(1-p))
 	# E(d_bar) = 1/n(sum(di)) == 1/n (n*sum(di))
-	# pandas.Series.radd is slow for some reason. Use '-' operator instead.
 	n = len(mean)
-	sigma_freq: pandas.Series = mean.mul(1 - mean)
+	sigma_freq = mean * (1 - mean)
 	# Difference of frequencies at each timepoint
-	# difference: pandas.Series = not_detected_fixed_df.iloc[:, 0] - not_detected_fixed_df.iloc[:, 1]
-	difference = not_detected_fixed_df.diff(axis = 1).iloc[:, 1]
+	difference = frequencies[1] - frequencies[0]
 
-	sigma_pair: float = sigma_freq.sum() / n ** 2
+	sigma_pair: float = numpy.nansum(sigma_freq) / n ** 2
 	# Sum of differences
-	difference_mean: float = abs(difference).sum() / n
+	difference_mean: float = numpy.nansum(numpy.abs(difference)) / n
 
 	X = difference_mean / (math.sqrt(2 * sigma_pair))
 
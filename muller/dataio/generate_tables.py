@@ -1,5 +1,6 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
+import numpy
 import pandas
 
 
@@ -26,11 +27,9 @@ class GGMuller:
 	@staticmethod
 	def _compile_parent_linkage(edges: pandas.Series) -> Dict[str, List[str]]:
 		""" Maps a genotype to a list of all genotypes that inherit from it"""
-		children = dict()
-		for identity, parent in edges.items():
-			if parent not in children:
-				children[parent] = list()
-			children[parent].append(identity)
+		# Group the identities by parent in a single pass. `sort = False` keeps both the parents and children in the original order.
+		identities = pandas.Series(edges.index, index = edges.values)
+		children = identities.groupby(level = 0, sort = False).agg(list).to_dict()
 		return children
 
 	@staticmethod
@@ -49,55 +48,61 @@ class GGMuller:
 					`Identity`: str
 					`Population`: float
 		"""
-		table = list()
-		for genotype_label, genotype_frequencies in genotype_table.iterrows():
-			# Remove timepoints where the value was 0 or less than 0 due to above line.
-			for timepoint, frequency in genotype_frequencies.items():
-				row = {
-					'Identity':   genotype_label,
-					'Generation': int(timepoint),
-					'Population': frequency * 100
-				}
-				table.append(row)
-
-		temp_df = pandas.DataFrame(table)
+		# Build each column directly. The rows are ordered by genotype, then by timepoint.
+		total_genotypes, total_timepoints = genotype_table.shape
+		temp_df = pandas.DataFrame({
+			'Identity':   numpy.repeat(genotype_table.index.values, total_timepoints),
+			'Generation': numpy.tile([int(timepoint) for timepoint in genotype_table.columns], total_genotypes),
+			'Population': genotype_table.values.ravel() * 100
+		})
 		return temp_df
 
 	def _subtract_children_from_parent(self, modified_genotypes: pandas.DataFrame, children: Dict[str, List[str]]) -> pandas.DataFrame:
 		""" Reduces the observed frequency of parent genotypes to allow child genotypes to be visible at the correct vertical abundance."""
 
-		children_table = list()
-		for genotype_label, genotype in modified_genotypes.iterrows():
-			if genotype_label in children:
-				genotype_frequencies = genotype[genotype > self.cutoff_detection]
-				genotype_children: pandas.Series = modified_genotypes.loc[children[genotype_label]].max()
-				genotype_frequencies: pandas.Series = genotype_frequencies - genotype_children
-				genotype_frequencies = genotype_frequencies.mask(lambda s: s < self.cutoff_detection, self.visible_slice)
-				genotype_frequencies = genotype_frequencies.fillna(0)  # Otherwise plotting the muller diagram will fail.
-			else:
-				genotype_frequencies = genotype
-			genotype_frequencies.name = genotype_label
-			children_table.append(genotype_frequencies)
-		return pandas.DataFrame(children_table)
-
-	def add_ancestral_genotype(self, population_table: pandas.DataFrame) -> pandas.DataFrame:
-		""" Adds the ancestral genotype to the graphic. This is based on the observed frequencies at each timepoint and whether they sum to 100%."""
-		generation_groups = population_table.groupby(by = 'Generation')
-		modified_population = population_table
-		for generation, group in generation_groups:
-			# Check if the observed genotypes collectively sum to 100%.
-			population = group['Population'].sum()
-			if population > 100:
-				p = 0
-			else:
-				p = 100 - population
-			current_timepoint = {
-				'Generation': generation,
-				"Identity":   self.ancestral_genotype_label,
-				"Population": p
-			}
-			# Since `modified_population` is a dataframe, need to manually tell it to ignore the index.
-			modified_population = modified_population.append(current_timepoint, ignore_index = True)
+		parents = [label for label in modified_genotypes.index if label in children]
+		if not parents:
+			return modified_genotypes.copy()
+
+		# Calculate the maximum frequency of each parent's children at every timepoint in a single groupby.
+		child_labels = [child for parent in parents for child in children[parent]]
+		child_parents = [parent for parent in parents for _ in children[parent]]
+		child_maximums: pandas.DataFrame = modified_genotypes.reindex(child_labels).groupby(child_parents).max()
+
+		parent_values = modified_genotypes.loc[parents].values
+		parent_frequencies = parent_values - child_maximums.loc[parents].values
+		# Timepoints where the parent was not detected are set to 0. Otherwise plotting the muller diagram will fail.
+		is_detected = (parent_values > self.cutoff_detection) & ~numpy.isnan(parent_frequencies)
+		parent_frequencies = numpy.where(
+			is_detected,
+			numpy.where(parent_frequencies < self.cutoff_detection, self.visible_slice, parent_frequencies),
+			0
+		)
+
+		children_table = modified_genotypes.copy()
+		children_table.loc[parents] = parent_frequencies
+		return children_table
+
+	def add_ancestral_genotype(self, population_table: pandas.DataFrame, generation_totals: Optional[pandas.Series] = None) -> pandas.DataFrame:
+		""" Adds the ancestral genotype to the graphic. This is based on the observed frequencies at each timepoint and whether they sum to 100%.
+			Parameters
+			----------
+			population_table: pandas.DataFrame
+			generation_totals: Optional[pandas.Series]
+				The total population at each generation, if it is already known. Otherwise it is calculated from `population_table`.
+		"""
+		# Check if the observed genotypes collectively sum to 100% at each timepoint.
+		if generation_totals is None:
+			population = population_table.groupby(by = 'Generation')['Population'].sum()
+		else:
+			# Combines any timepoints which map to the same generation and sorts them.
+			population = generation_totals.groupby(level = 0).sum()
+		ancestral_population = pandas.DataFrame({
+			'Generation': population.index,
+			'Identity':   self.ancestral_genotype_label,
+			'Population': (100 - population).clip(lower = 0).values
+		})
+		modified_population = pandas.concat([population_table, ancestral_population], ignore_index = True, sort = False)
 		return modified_population
 
 	def generate_ggmuller_population_table(self, edges: pandas.Series, mean_genotypes: pandas.DataFrame) -> pandas.DataFrame:
@@ -120,10 +125,9 @@ class GGMuller:
 		# Adjust populations to account for inheritance.
 		# If a child genotype fixed, the parent genotype should be replaced.
 
-		# Use a copy of the dataframe to avoid making changes to the original.
-		modified_genotypes: pandas.DataFrame = mean_genotypes.copy(True)
 		# In case the genotype table includes genotypes that the edges table does not have.
-		modified_genotypes = modified_genotypes[modified_genotypes.index.isin(edges.index)]
+		# Boolean indexing already returns a new dataframe, so the original table won't be modified and doesn't need to be copied first.
+		modified_genotypes: pandas.DataFrame = mean_genotypes[mean_genotypes.index.isin(edges.index)]
 
 		# Generate a list of all genotypes that arise in the background of each genotype.
 		# Should ba a dict mapping parent -> list[children]
@@ -133,7 +137,10 @@ class GGMuller:
 		else:
 			child_df = modified_genotypes
 		temp_df = self._convert_genotype_table_to_population_table(child_df)
-		population_table = self.add_ancestral_genotype(temp_df)
+		# The per-generation totals are just the column sums of the wide table, so there's no need to group the long-form table.
+		generation_totals = (child_df * 100).sum(axis = 0)
+		generation_totals.index = [int(timepoint) for timepoint in generation_totals.index]
+		population_table = self.add_ancestral_genotype(temp_df, generation_totals)
 
 		return population_table
 
@@ -238,7 +238,9 @@ class GenerateMullerDataFrame:
 	def _get_initial_generations(self, population: pandas.DataFrame) -> pandas.DataFrame:
 		""" Maps each genotype to both the first timepoint it appears as well as the previous timepoint."""
 		genotype_groups = population.groupby(by = "Identity")
-		table = list()
+		identities = list()
+		start_times = list()
+		previous_times = list()
 		for identity, group in genotype_groups:
 			detected = group[group[self.population_column] > self.detection_limit]
 			detected_timepoint = detected[self.time_column].min()
@@ -251,16 +253,16 @@ class GenerateMullerDataFrame:
 			else:
 				previous_timepoint = detected_timepoint  # Not sure if this is the way the original script handled this edge case.
 
-			row = {
-				self.identity_column: identity,
-				'start_time':         detected_timepoint,
-				'previous_time':      previous_timepoint
-			}
-			table.append(row)
+			identities.append(identity)
+			start_times.append(detected_timepoint)
+			previous_times.append(previous_timepoint)
 
-		df = pandas.DataFrame(table)
-
-		df = df[[self.identity_column, 'start_time', 'previous_time']]  # sort columns to match ggmuller
+		# The columns are given in the same order as ggmuller.
+		df = pandas.DataFrame({
+			self.identity_column: identities,
+			'start_time':         start_times,
+			'previous_time':      previous_times
+		})
 
 		# Remove `generation-0` to match the ggmuller script
 		df = df[df['start_time'] != 0]
@@ -271,11 +273,12 @@ class GenerateMullerDataFrame:
 		""" Generates a two-column table which pairs every left value with every right value.
 			The resulting table will be len(left) * len(right) rows.
 		"""
-		added_rows = list()
-		for left in left_values:
-			for right in right_values:
-				added_rows.append({'Left': left, 'Right': right})
-		added_rows = pandas.DataFrame(added_rows)
+		left_values = list(left_values)
+		right_values = list(right_values)
+		added_rows = pandas.DataFrame({
+			'Left':  [left for left in left_values for _ in right_values],
+			'Right': right_values * len(left_values)
+		})
 
 		return added_rows
 
@@ -367,9 +370,8 @@ class GenerateMullerDataFrame:
 	def _reorder_by_vector_generate_unique_ids_generation(df: pandas.DataFrame) -> List[str]:
 		seen = set()
 		uids = list()
-		for index, row in df.iterrows():
-			name = row['Identity']
-			generation = row['Generation']
+		# Iterate over the columns directly rather than creating a Series for every row.
+		for name, generation in zip(df['Identity'].tolist(), df['Generation'].tolist()):
 			# Check if the `generation` value can be safely converted to int to match ggmuller.
 			if generation - int(generation) == 0:
 				generation = int(generation)
@@ -1,6 +1,7 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Union, Dict, List
+from typing import Any, Union, Dict, List, Tuple
 import pandas
 
 
@@ -99,18 +100,29 @@ class OutputFilenames:
 			should be indexed by trajectory id.
 		"""
 		# Convert the mapping from genotype->members into members->genotype
-		trajectory_genotypes = dict()
-		for genotype_name, genotype_members in genotype_members.items():
-			for member_name in genotype_members:
-				trajectory_genotypes[member_name] = genotype_name
+		genotype_members = pandas.Series(genotype_members, dtype = object).explode().dropna()
+		trajectory_genotypes = pandas.Series(genotype_members.index, index = genotype_members.values)
+		# If a trajectory is listed under multiple genotypes, use the last one.
+		trajectory_genotypes = trajectory_genotypes[~trajectory_genotypes.index.duplicated(keep = 'last')]
 
 		table_trajectories = table_trajectories.merge(table_info, left_index = True, right_index = True, how = 'outer')
 
 		# Add a column to the `trajectories` table with the resulting parent genotype.
-		table_trajectories['genotype'] = [trajectory_genotypes.get(i, 'rejected') for i in table_trajectories.index]
+		table_trajectories['genotype'] = trajectory_genotypes.reindex(table_trajectories.index).fillna('rejected').values
 
 		return table_trajectories
 
+	@staticmethod
+	def _save_tables(tables: List[Tuple[pandas.DataFrame, Path, Dict[str, Any]]]):
+		""" Writes each (table, filename, to_csv options) entry concurrently, since most of the time is spent waiting on the disk."""
+		if not tables:
+			return
+		with ThreadPoolExecutor(max_workers = len(tables)) as executor:
+			futures = [executor.submit(table.to_csv, filename, **options) for table, filename, options in tables]
+		# Re-raise any errors that occurred while writing the tables.
+		for future in futures:
+			future.result()
+
 	@staticmethod
 	def get_template(folder: Path, template: str, extension: str):
 		"""
@@ -139,17 +151,18 @@ class OutputFilenames:
 			data.genotype_members
 		)
 
-		table_trajectories.to_csv(self.filename_table_trajectories, sep = self.delimiter)
+		tables = [(table_trajectories, self.filename_table_trajectories, {'sep': self.delimiter})]
 		# TODO: merge table_trajectories_info with the trajectories table.
 		# data.table_trajectories_info.to_csv()
 		members = {key: '|'.join(values) for key, values in data.genotype_members.items()}
 
 		data.table_genotypes['members'] = [members[i] for i in data.table_genotypes.index]
-		data.table_genotypes.to_csv(self.filename_table_genotypes, sep = self.delimiter)
+		tables.append((data.table_genotypes, self.filename_table_genotypes, {'sep': self.delimiter}))
 		if data.matrix_distance is not None:
-			data.matrix_distance.squareform().to_csv(self.filename_table_distance, sep = self.delimiter)
+			tables.append((data.matrix_distance.squareform(), self.filename_table_distance, {'sep': self.delimiter}))
 		if data.clusterdata is not None:
-			data.clusterdata.table_linkage.to_csv(self.filename_table_linkage, sep = self.delimiter)
+			tables.append((data.clusterdata.table_linkage, self.filename_table_linkage, {'sep': self.delimiter}))
+		self._save_tables(tables)
 
 		self.filename_data_genotype_members.write_text(json.dumps(data.genotype_members, indent = 4, sort_keys = True))
 
@@ -161,15 +174,18 @@ class OutputFilenames:
 		data.table_scores.to_csv(self.filename_table_lineage_scores, sep = self.delimiter, index = False)
 
 	def save_workflow_ggmuller(self, data):
+		options = {'sep': self.delimiter, 'index': False}
+		tables = list()
 		if not self.filename_table_population.exists():
-			data.table_populations.to_csv(self.filename_table_population, sep = self.delimiter, index = False)
+			tables.append((data.table_populations, self.filename_table_population, options))
 		if not self.filename_table_edges.exists():
 			table_edges = data.series_edges.to_frame().reset_index()
 			# GGmuller expected the columns to be ordered as ['Parent', 'Identity']
 			table_edges = table_edges[['Parent', 'Identity']]
-			table_edges.to_csv(self.filename_table_edges, sep = self.delimiter, index = False)
+			tables.append((table_edges, self.filename_table_edges, options))
 
-		data.table_muller.to_csv(self.filename_table_muller, sep = self.delimiter, index = False)
+		tables.append((data.table_muller, self.filename_table_muller, options))
+		self._save_tables(tables)
 
 	@property
 	def delimiter(self) -> str:
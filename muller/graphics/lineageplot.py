@@ -8,8 +8,9 @@ from loguru import logger
 from muller import widgets
 
 
-def get_node_label_properties(identity: str, genotype_color: str, annotation: List[str]) -> Dict[str, str]:
-	luminance = widgets.calculate_luminance(genotype_color)
+def get_node_label_properties(identity: str, genotype_color: str, annotation: List[str], luminance: Optional[float] = None) -> Dict[str, str]:
+	if luminance is None:
+		luminance = widgets.calculate_luminance(genotype_color)
 	if luminance > 0.5:
 		font_color = "#333333"
 	else:
@@ -56,22 +57,27 @@ def flowchart(edges: pandas.DataFrame, palette: Dict[str, str], annotations: Dic
 	graph.node_attr['fontname'] = 'lato'
 	graph.edge_attr['dir'] = 'forward'
 
-	for identity in edges[identity_column].unique():
-		genotype_color = palette.get(identity)
+	identities = edges[identity_column].unique()
+	genotype_colors = [palette.get(identity) for identity in identities]
+	# Calculate the luminance of every node at once.
+	luminances = widgets.calculate_luminance_batch(genotype_colors)
+	for identity, genotype_color, luminance in zip(identities, genotype_colors, luminances):
 		graph.add_node(identity, color = "#333333", fillcolor = genotype_color)
 		node = graph.get_node(identity)
-		node_label_properties = get_node_label_properties(identity, genotype_color, annotations.get(identity, []))
+		node_label_properties = get_node_label_properties(identity, genotype_color, annotations.get(identity, []), luminance)
 		node.attr.update(node_label_properties)
 
-	for index, row in edges.iterrows():
-		parent = row[parent_column]
-		identity = row[identity_column]
+	# Iterate over the columns directly rather than building a Series for every row.
+	if 'score' in edges.columns:
+		scores = edges['score'].tolist()
+	else:
+		scores = [0] * len(edges)
+	for parent, identity, score in zip(edges[parent_column].tolist(), edges[identity_column].tolist(), scores):
 		arguments = {
 			'tooltip': f"{parent}",
 			'labeldistance': 2.0
 		}
 		if add_score:
-			score = row.get('score', 0)
 			arguments['headlabel'] = f"{score:.1f}"
 		graph.add_edge(parent, identity, **arguments)
 
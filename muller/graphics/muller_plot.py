@@ -8,11 +8,13 @@ from itertools import filterfalse
 from pathlib import Path
 from typing import *
 
+import numpy
 import pandas
 from loguru import logger
 from matplotlib import pyplot as plt
 # plt.switch_backend('agg')
-from matplotlib.figure import Axes  # For autocomplete
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Axes, Figure  # For autocomplete
 
 # Make sure the svg files save the labels as actualt text.
 plt.rcParams['svg.fonttype'] = 'none'
@@ -63,21 +65,32 @@ def distance(left: Tuple[float, float], right: Tuple[float, float]) -> float:
 	return math.sqrt(num)
 
 
+def _squared_distances(point: Tuple[float, float], locations: numpy.ndarray) -> numpy.ndarray:
+	""" Calculates the squared distance from `point` to each row of `locations`. Used since the square root isn't needed to compare distances."""
+	difference = locations - numpy.asarray(point, dtype = float)
+	return numpy.einsum('ij,ij->i', difference, difference)
+
+
 def find_closest_point(point, points: List[Tuple[float, float]]) -> Tuple[float, float]:
-	return min(points, key = lambda s: distance(s, point))
+	index = _squared_distances(point, numpy.asarray(points, dtype = float)).argmin()
+	return points[index]
 
 
-def relocate_point(point: Tuple[float, float], locations: List[Tuple[float, float]]) -> Tuple[float, float]:
+def relocate_point(point: Tuple[float, float], locations: Union[List[Tuple[float, float]], numpy.ndarray]) -> Tuple[float, float]:
+	# Convert the locations once rather than on every iteration.
+	locations = numpy.asarray(locations, dtype = float).reshape(-1, 2)
 	x_loc, y_loc = point
 	for _ in range(10):
-		closest_neighbor = find_closest_point((x_loc, y_loc), locations)
-		y_is_close = math.isclose(y_loc, closest_neighbor[1], abs_tol = .1)
-		y_is_almost_close = math.isclose(y_loc, closest_neighbor[1], abs_tol = .3)
-		x_is_close = math.isclose(x_loc, closest_neighbor[0], abs_tol = 2)
-		x_large = x_loc >= closest_neighbor[0]
-		if distance(closest_neighbor, (x_loc, y_loc)) > 1: break
+		squared_distances = _squared_distances((x_loc, y_loc), locations)
+		index = squared_distances.argmin()
+		closest_x, closest_y = locations[index]
+		y_is_close = abs(y_loc - closest_y) <= .1
+		y_is_almost_close = abs(y_loc - closest_y) <= .3
+		x_is_close = abs(x_loc - closest_x) <= 2
+		x_large = x_loc >= closest_x
+		if squared_distances[index] > 1: break
 		if y_is_close:
-			if y_loc > closest_neighbor[1]:
+			if y_loc > closest_y:
 				y_loc += random.uniform(.1, .2)
 			else:
 				y_loc -= random.uniform(.05, .10)
@@ -188,8 +201,11 @@ class MullerPlot:
 		if ax is None:
 			figsize_x = self.scale * 12
 			figsize_y = self.scale * 10
-
-			fig, ax = plt.subplots(figsize = (figsize_x, figsize_y))
+			# Create the figure directly rather than through pyplot. pyplot keeps a reference to every figure it creates,
+			# so each diagram would otherwise stay in memory for the rest of the session.
+			fig = Figure(figsize = (figsize_x, figsize_y))
+			FigureCanvasAgg(fig)
+			ax = fig.subplots()
 		return ax
 
 	def _get_annotation_label_background_properties(self, genotype_color: str) -> Dict[str, str]:
@@ -286,9 +302,16 @@ class MullerPlot:
 
 		return palettes.generate_palette(labels)
 
-	def save_figure(self, filename: Path):
-		""" Saves the diagram in every format available in self.filetypes"""
-		plt.savefig(filename, dpi = self.dpi if filename.suffix != '.svg' else None)  # Not sure if setting DPI for svgs raises an error.
+	def save_figure(self, filename: Union[Path, Iterable[Path]], figure: Optional[Figure] = None):
+		""" Saves the diagram to each of the given filenames. The figure is only drawn once, regardless of how many formats are requested.
+			Uses the current pyplot figure if `figure` is not provided.
+		"""
+		if figure is None:
+			figure = plt.gcf()
+		filenames = [filename] if isinstance(filename, (str, Path)) else filename
+		for filename in filenames:
+			filename = Path(filename)
+			figure.savefig(filename, dpi = self.dpi if filename.suffix != '.svg' else None)  # Not sure if setting DPI for svgs raises an error.
 
 	@staticmethod
 	def generate_muller_series(muller_df: pandas.DataFrame, color_palette: Dict[str, str]) -> Tuple[
@@ -305,9 +328,9 @@ class MullerPlot:
 		-------
 		x, y, colors, labels
 		"""
-		genotype_order = list(unique_everseen(muller_df['Group_id'].tolist()))
+		genotype_order = muller_df['Group_id'].drop_duplicates().tolist()
 
-		x_values = list(unique_everseen(muller_df['Generation'].tolist()))
+		x_values = muller_df['Generation'].drop_duplicates().tolist()
 		# Extract the labels for each genotype, preserving the order they will be plotted in. If the
 		# genotype was split up, only keep one of the series labels.
 
@@ -315,15 +338,9 @@ class MullerPlot:
 		labels = muller_df['Identity'].unique()
 		colors = [color_palette[label[:-1] if (label.endswith('a') and label not in labels) else label] for label in genotype_order]
 
-		groups = muller_df.groupby(by = 'Group_id')
-
-		# Keep track of which genotype series have already been processed.
-		# Skip the second genotype series if both halves have already been merged.
-		ys = list()
-		for index, label in enumerate(genotype_order):
-			# The genotype contains child genotypes, so it has to be kept split.
-			genotype_series = groups.get_group(label)['Frequency'].tolist()
-			ys.append(genotype_series)
+		# Collect the frequencies of every series in a single pass rather than selecting each group individually.
+		series_frequencies = muller_df.groupby(by = 'Group_id', sort = False)['Frequency'].apply(list).to_dict()
+		ys = [series_frequencies[label] for label in genotype_order]
 
 		return x_values, ys, colors, labels
 
@@ -332,7 +349,7 @@ class MullerPlot:
 			We want to merge these halves if they are plotted adjacent to each other.
 		"""
 		# Get the order that each series appears.
-		genotype_order = list(unique_everseen(muller_df['Group_id'].tolist()))
+		genotype_order = pandas.unique(muller_df['Group_id'].values).tolist()
 		# Each genotype should have a corresponding second-half table.
 		groups = muller_df.groupby(by = 'Group_id')
 		seen = set()
@@ -355,31 +372,36 @@ class MullerPlot:
 				# The genotype contains child genotypes, so it has to be kept split.
 				genotype_series = groups.get_group(label)
 			merged_table.append(genotype_series)
-		return pandas.concat(merged_table, sort = True)
+		# The merged genotypes order their columns differently, but the columns are only ever accessed by name.
+		# So there's no need to sort them when concatenating.
+		return pandas.concat(merged_table, sort = False)
 
 	def add_genotype_annotations_to_plot(self, ax: Axes, points: Dict[str, Tuple[float, float]], annotations: Dict[str, List[str]],
 			color_palette: Dict[str, str]) -> Axes:
-		locations = list()
+		# Keep track of where each annotation was placed so that they don't overlap.
+		locations = numpy.empty((len(points), 2))
+		total_locations = 0
 		for genotype_label, point in points.items():
 			if genotype_label == self.root_genotype_name:
 				# There's no point in adding an annotation for the root genotype.
 				continue
 
-			genotype_color: str = color_palette[genotype_label]
 			genotype_annotations: List[str] = annotations.get(genotype_label, [])
 			if not genotype_annotations:
 				# No annotations for this genome. Don't draw anything.
 				continue
 
+			genotype_color: str = color_palette[genotype_label]
 			background_properties = self._get_annotation_label_background_properties(genotype_color)
 			label_properties = self._get_annotation_label_font_properties(genotype_color)
 
-			if locations:
-				x_loc, y_loc = relocate_point(point, locations)
+			if total_locations:
+				x_loc, y_loc = relocate_point(point, locations[:total_locations])
 			else:
 				x_loc, y_loc = point
 
-			locations.append((x_loc, y_loc))
+			locations[total_locations] = x_loc, y_loc
+			total_locations += 1
 			ax.text(
 				x_loc, y_loc,
 				"\n".join(genotype_annotations),
@@ -404,23 +426,26 @@ class MullerPlot:
 
 		# We need to keep track of when each series is plotted. There will be one or two series for each genotype, depending on if they have
 		# been merged.
-		genotype_order = list()
-		for index, row in muller_df.iterrows():
-			genotype_label = row['Group_id']
-			if genotype_label not in genotype_order:
-				genotype_order.append(genotype_label)
+		genotype_order = muller_df['Group_id'].drop_duplicates().tolist()
+		identities = set(muller_df['Identity'].unique())
 
 		# We don't care about when the series had a value of zero. Exclude these timepoints.
 		nonzero = muller_df[muller_df['Population'] != 0]
 
+		# The total frequency of every series plotted before a given series, at each generation.
+		# Rows are generations and columns are the series in the order they are plotted.
+		frequencies = muller_df.groupby(['Generation', 'Group_id'])['Frequency'].sum().unstack()
+		frequencies = frequencies.reindex(columns = genotype_order).fillna(0)
+		previous_frequency_table = frequencies.cumsum(axis = 1).shift(1, axis = 1).fillna(0)
+
 		# Iterate over the nonzero timepoints for each series and try to find the middle of the series.
 		points = dict()
 		groups = nonzero.groupby(by = 'Group_id')
 
-		for index, name, in enumerate(genotype_order):
+		for name in genotype_order:
 			# muller_df splits each genotype so that it can draw them in the correct order as a stacked area chart.
 			# The second series label has an additional 'a' character at the end to distinguish it from the first series for each genotype.
-			genotype_label = name[:-1] if (name.endswith('a') and name not in muller_df['Identity'].unique()) else name
+			genotype_label = name[:-1] if (name.endswith('a') and name not in identities) else name
 
 			# Check if this genotype has already been assigned a location.
 			if genotype_label in points: continue
@@ -436,9 +461,7 @@ class MullerPlot:
 			# This is the centroid for the genotype series as-is.
 			# This does not take into account the fact that the previously plotted genotypes will change the plotted
 			# y-value of the series. So, find how much the y-value is changed due to plotting and add it to the centroid's y-value.
-			previous_genotype_labels = genotype_order[:index]
-			previous_genotype_table = muller_df[(muller_df['Group_id'].isin(previous_genotype_labels)) & (muller_df['Generation'] == centroid[0])]
-			previous_frequencies = sum(previous_genotype_table['Frequency'].values)
+			previous_frequencies = previous_frequency_table.at[centroid[0], name]
 			points[genotype_label] = (centroid[0], previous_frequencies + centroid[1])
 		return points
 
@@ -473,7 +496,7 @@ class MullerPlot:
 
 
 
-	def plot(self, muller_df: pandas.DataFrame, filename:Path = None, color_palette: Dict[str, str] = None,
+	def plot(self, muller_df: pandas.DataFrame, filename: Union[Path, Iterable[Path]] = None, color_palette: Dict[str, str] = None,
 			annotations: Optional[Dict[str, List[str]]] = None,
 			title: Optional[str] = None, ax: Optional[plt.Axes] = None) -> plt.Axes:
 		"""
@@ -482,7 +505,8 @@ class MullerPlot:
 		----------
 		muller_df: pandas.DataFrame
 		color_palette: Dict[str,str]
-		filename: Path
+		filename: Union[Path, Iterable[Path]]
+			Where to save the diagram. Multiple filenames can be given to save the same diagram in several formats.
 		annotations: Dict[str, List[str]]
 			A map of genotype labels to add to the plot.
 		title: Optional[str]
@@ -534,6 +558,6 @@ class MullerPlot:
 		ax = self._apply_style(ax, title, max(x))
 		if filename:
 			#logger.info(f"Saving the muller plot as {filename.absolute()}")
-			self.save_figure(filename)
+			self.save_figure(filename, ax.figure)
 
 		return ax
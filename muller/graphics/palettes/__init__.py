@@ -1,3 +1,3 @@
-from .colorset import random_color, rgbtohex
+from .colorset import random_color, random_colors, rgbtohex
 from .general import generate_palette
 from .palette import Palette
\ No newline at end of file
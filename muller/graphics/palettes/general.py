@@ -29,10 +29,9 @@ def generate_palette(edges: pandas.Series, custom_palette: Dict[str, str] = None
 		palette = generate_annotation_palette(annotations, custom_palette)
 	else:
 		palette = generate_distinctive_palette(unique_genotypes)
-	for label in unique_genotypes:
-		new_color = custom_palette.get(label, palette.get(label))
-		if new_color is None:
-			palette[label] = colorset.random_color()
+	missing_labels = [label for label in unique_genotypes if custom_palette.get(label, palette.get(label)) is None]
+	if missing_labels:
+		palette.update(zip(missing_labels, colorset.random_colors(len(missing_labels))))
 
 	palette['genotype-0'] = "#FFFFFF"
 	palette['removed'] = "#333333"
@@ -12,15 +12,17 @@ def generate_distinctive_palette(genotypes: List[str]) -> Dict[str, str]:
 	""" Assigns a unique color to each genotype."""
 	# TODO: If the genotype label specifies a color, use that instead.
 	color_palette = colorset.get_distinctive_palette(len(genotypes))
+	# Split each label once. The pieces are used to both sort the labels and check whether the label names a color.
+	label_parts = {label: label.split('-') for label in genotypes}
 	if re.search("genotype-[\d]+", genotypes[0]):
-		genotype_labels = sorted(genotypes, key = lambda s: int(s.split('-')[-1]))
+		genotype_labels = sorted(genotypes, key = lambda s: int(label_parts[s][-1]))
 	else:
 		genotype_labels = genotypes
 	# Use an OrderedDict to help with providing the correct order for the r script.
 	color_map = OrderedDict()
 	for label, color in zip(genotype_labels, color_palette):
 		# If the genotype name specifies a color, use that.
-		genotype_name = label.split('-')[1]
+		genotype_name = label_parts[label][1]
 		if genotype_name in available_colors:
 			color_map[label] = available_colors[genotype_name]
 		else:
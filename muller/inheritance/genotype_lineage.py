@@ -70,10 +70,11 @@ class LineageWorkflow:
 
 		score_records: List[Dict[str, float]] = list()  # Keeps track of the individual score values for each pair
 
-		for unnested_label, unnested_trajectory in sorted_genotypes[1:].iterrows():
+		# Build each genotype series once rather than iterating over a new slice of the table for every unnested genotype.
+		genotype_rows: List[Tuple[str, pandas.Series]] = list(sorted_genotypes.iterrows())
+		for position, (unnested_label, unnested_trajectory) in enumerate(genotype_rows[1:], start = 1):
 			# Iterate over the rest of the table in reverse order. Basically, we start with the newest nest and iterate until we find a nest that satisfies the filters.
-			test_table = sorted_genotypes[:unnested_label].iloc[::-1]
-			for nested_label, nested_genotype in test_table.iterrows():
+			for nested_label, nested_genotype in reversed(genotype_rows[:position + 1]):
 				if nested_label == unnested_label: continue
 				score_data = self.scorer.score_pair(nested_genotype, unnested_trajectory)
 				score_records.append(score_data)
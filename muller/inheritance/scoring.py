@@ -1,7 +1,7 @@
 import math
-import statistics
 from typing import Dict, List, Tuple
 
+import numpy
 import pandas
 import scipy.stats as stats
 from loguru import logger
@@ -56,10 +56,16 @@ class LegacyScore:
 		"""
 		# Pandas implementation of the derivative check, since it basically just checks for covariance.
 		valid_left, valid_right = widgets.get_valid_points(left, right, self.dlimit, self.flimit)
-		if valid_left.empty:
+		# Same as `valid_left.cov(valid_right)`, but computed directly from the arrays to skip the index alignment.
+		left_values = valid_left.values.astype(float)
+		right_values = valid_right.values.astype(float)
+		is_valid = ~(numpy.isnan(left_values) | numpy.isnan(right_values))
+		if is_valid.sum() < 2:
 			covariance = math.nan
 		else:
-			covariance = valid_left.cov(valid_right)
+			left_centered = left_values[is_valid] - left_values[is_valid].mean()
+			right_centered = right_values[is_valid] - right_values[is_valid].mean()
+			covariance = numpy.dot(left_centered, right_centered) / (is_valid.sum() - 1)
 
 		if covariance > 0.01: score = 2
 		elif covariance < -0.01: score = -2
@@ -142,13 +148,17 @@ class Score:
 		return boolseries
 
 	def calculate_score_greater(self, nested_genotype: pandas.Series, unnested_genotype: pandas.Series) -> float:
-		use_advanced = False
 		series_overlap = widgets.overlap(nested_genotype, unnested_genotype, self.dlimit)
 		if series_overlap == 0:
 			return self.weight_greater * -1
 
 		# THe t-test has to be corrected for the case where the two series do not completely overlap
 		nested_genotype, unnested_genotype = widgets.get_valid_points(nested_genotype, unnested_genotype, self.dlimit)
+		return self._calculate_score_greater_detected(nested_genotype, unnested_genotype)
+
+	def _calculate_score_greater_detected(self, nested_genotype: pandas.Series, unnested_genotype: pandas.Series) -> float:
+		""" Same as `calculate_score_greater()`, but assumes the series overlap and have already been reduced to the detected timepoints."""
+		use_advanced = False
 		if use_advanced:
 			raise NotImplementedError
 		else:
@@ -213,19 +223,19 @@ class Score:
 	def _multiple_sample_ttest(self, left:pandas.Series, right:pandas.Series):
 		combined_series = (left + right).tolist()[1:]
 
-		mean_c = statistics.mean(combined_series)
+		mean_c = math.fsum(combined_series) / len(combined_series)
 		var_c = self.dlimit
 		mean_f = 1 + self.dlimit
 		var_f = self.dlimit
 
-		forward_statistic, forward_pvalue = stats.ttest_ind_from_stats(
-			mean1 = mean_c,
-			std1 = var_c ** 2,
-			nobs1 = len(combined_series),
-			mean2 = mean_f,
-			std2 = var_f ** 2,
-			nobs2 = len(combined_series)
-		)
+		# Equivalent to `stats.ttest_ind_from_stats` with equal variances, but skips the wrapper overhead since this is called for every pair of genotypes.
+		nobs = len(combined_series)
+		degrees_of_freedom = 2 * nobs - 2
+		# Use numpy division so that a detection limit of 0 (no variance) results in +/-inf or nan rather than an error, like scipy.
+		with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+			pooled_variance = numpy.float64((nobs - 1) * (var_c ** 2) ** 2 + (nobs - 1) * (var_f ** 2) ** 2) / degrees_of_freedom
+			forward_statistic = numpy.float64(mean_c - mean_f) / numpy.sqrt(pooled_variance * (2 / nobs))
+		forward_pvalue = 2 * stats.t.sf(abs(forward_statistic), degrees_of_freedom)
 		return forward_statistic, forward_pvalue
 
 	def calculate_score_above_fixed(self, left: pandas.Series, right: pandas.Series) -> int:
@@ -239,6 +249,10 @@ class Score:
 		"""
 		# Including points where one genotype was not detected will skew the results.
 		left, right = widgets.get_valid_points(left, right, dlimit = self.dlimit, inner = True)
+		return self._calculate_score_above_fixed_overlapping(left, right)
+
+	def _calculate_score_above_fixed_overlapping(self, left: pandas.Series, right: pandas.Series) -> int:
+		""" Same as `calculate_score_above_fixed()`, but assumes the series have already been reduced to the timepoints where both were detected."""
 		combined_series = (left + right).tolist()[1:]
 
 		if len(combined_series) == 0:
@@ -359,12 +373,20 @@ class Score:
 			logger.debug(f"\t{detected_left.values}")
 			logger.debug(f"\t{detected_right.values}")
 
+		# The timepoints where both series were detected are used by several of the checks, so only find them once.
+		# This is the same as applying `inner = True` to the original series, since those timepoints are a subset of the detected timepoints.
+		overlapping_left, overlapping_right = widgets.get_valid_points(detected_left, detected_right, dlimit = self.dlimit, inner = True)
+
 		if len(detected_left) < 3:
 			score_fixed = self.legacy_scorer.calculate_summation_score(detected_left, detected_right)
 		else:
-			score_fixed = self.calculate_score_above_fixed(detected_left, detected_right)
+			score_fixed = self._calculate_score_above_fixed_overlapping(overlapping_left, overlapping_right)
 
-		score_greater = self.calculate_score_greater(detected_left, detected_right)
+		if overlapping_left.empty:
+			# The series never overlap.
+			score_greater = self.weight_greater * -1
+		else:
+			score_greater = self._calculate_score_greater_detected(detected_left, detected_right)
 		if math.isnan(score_greater): score_greater = 0
 		score_area = self.calculate_score_area(nested_genotype, unnested_trajectory)
 
@@ -377,8 +399,7 @@ class Score:
 			# evidence against the candidate background.
 
 			# The derivative score should only be computed using the timepoints where the series overlap.
-			detected_left, detected_right = widgets.get_valid_points(nested_genotype, unnested_trajectory, dlimit = self.dlimit, inner = True)
-			score_derivative = self.calculate_score_derivative(detected_left, detected_right)
+			score_derivative = self.calculate_score_derivative(overlapping_left, overlapping_right)
 			# Note that a previous version accidentlly added the derivative cutoff to the total score.
 			total_score += score_derivative
 		else:
@@ -397,16 +418,15 @@ class Score:
 
 	def derivative(self, left: pandas.Series, right: pandas.Series) -> Tuple[float, int]:
 		# l, r = widgets.get_valid_points(left, right, 0.03, 0.97, inner = True)
-		l, r = left, right
-		normalize = lambda s: 1 if s > self.dlimit else (-1 if s < -self.dlimit else 0)
-
-		ldiff = l.diff()[1:]
-		rdiff = r.diff()[1:]
+		# Work with the underlying arrays to avoid the index alignment pandas does for every operation.
+		ldiff = numpy.diff(left.values)
+		rdiff = numpy.diff(right.values)
 
-		result = ldiff.dot(rdiff)
+		result = numpy.dot(ldiff, rdiff)
 
-		ldiff = ldiff.apply(normalize)
-		rdiff = rdiff.apply(normalize)
+		# Convert each change into 1 (increasing), -1 (decreasing) or 0 (within the detection limit).
+		ldiff = (ldiff > self.dlimit).astype(int) - (ldiff < -self.dlimit).astype(int)
+		rdiff = (rdiff > self.dlimit).astype(int) - (rdiff < -self.dlimit).astype(int)
 
-		nresult = ldiff.dot(rdiff)
+		nresult = numpy.dot(ldiff, rdiff)
 		return result, nresult
@@ -1,3 +1,4 @@
+import numpy
 import pandas
 
 
@@ -18,7 +19,11 @@ def _get_timepoint_above_threshold(transposed_timepoints: pandas.DataFrame, cuto
 		A series mapping series name to the first timepoint that series first exceeded the threshold value.
 		Series that never exceed the threshold are mapped to a value of 0.
 	"""
-	threshold_series: pandas.Series = (transposed_timepoints > cutoff).idxmax(0).sort_values()
+	# Equivalent to `(transposed_timepoints > cutoff).idxmax(0)`, but uses numpy directly rather than building a boolean dataframe.
+	# Series which never exceed the cutoff are assigned the first timepoint, same as `idxmax()`.
+	first_positions = numpy.argmax(transposed_timepoints.values > cutoff, axis = 0)
+	threshold_series = pandas.Series(transposed_timepoints.index.values[first_positions], index = transposed_timepoints.columns)
+	threshold_series = threshold_series.sort_values()
 	if name:
 		threshold_series.name = name
 	return threshold_series
@@ -58,14 +63,15 @@ def get_first_significant_timepoint(transposed_genotypes: pandas.DataFrame, cuto
 
 	initial_genotype_values = transposed_genotypes.iloc[0].transpose()
 	first_above_threshold = _get_timepoint_above_threshold(transposed_genotypes, cutoff, 'firstSignificant')
-	first_above_threshold_reduced_dict = dict()
-	for key, value in first_above_threshold.items():
-		initial_value = initial_genotype_values[key]
-		if value == transposed_genotypes.index[0]:
-			value = value if initial_value > cutoff else transposed_genotypes.index[-1]
-		first_above_threshold_reduced_dict[key] = value
-
-	first_above_threshold_reduced = pandas.Series(first_above_threshold_reduced_dict, name = 'firstThreshold')
+	initial_genotype_values = initial_genotype_values.reindex(first_above_threshold.index)
+	# Genotypes assigned the first timepoint without actually exceeding the cutoff there never became significant.
+	# Assign them the last timepoint instead.
+	is_insignificant = (first_above_threshold.values == transposed_genotypes.index[0]) & ~(initial_genotype_values.values > cutoff)
+	first_above_threshold_reduced = pandas.Series(
+		numpy.where(is_insignificant, transposed_genotypes.index[-1], first_above_threshold.values),
+		index = first_above_threshold.index,
+		name = 'firstThreshold'
+	)
 	return first_above_threshold_reduced
 
 
@@ -1,16 +1,23 @@
-import csv
+import functools
+import io
 import itertools
 import math
 import re
 from pathlib import Path
 from typing import *
 
+import numpy
 import pandas
 from loguru import logger
 
 NumericType = Union[int, float]
 IterableValues = Union[List[NumericType], pandas.Series]
-NUMERIC_REGEX = re.compile("^.?(?P<number>[\d]+)")
+NUMERIC_REGEX = re.compile(r"^.?(?P<number>[\d]+)")
+# `get_fixed()` and `get_undetected()` are intermediate ranges with one open side. These dummy limits are used for the open side.
+FIXED_DUMMY_UPPER_LIMIT = 2
+UNDETECTED_DUMMY_LOWER_LIMIT = -2
+# `get_valid_points()` treats values above this as fixed when excluding fixed timepoints. This does not depend on the `--fixed` option.
+DETECTION_MASK_FIXED_LIMIT = 0.97
 
 def _coerce_to_series(item:Any)->pandas.Series:
 	if not isinstance(item, pandas.Series):
@@ -38,22 +45,17 @@ def checkdir(path: Union[str, Path]) -> Path:
 
 
 def get_numeric_columns(columns: List[Union[str, int, float]]) -> List[Union[str, int, float]]:
-	numeric_columns = list()
+	columns = list(columns)
+	candidates = list()
 	for column in columns:
 		if isinstance(column, str):
-			match = NUMERIC_REGEX.search(column)
-			if match:
-				col = match.groupdict()['number']
-			else:
-				continue
+			# The pattern is anchored and only matches digits, so a match is already enough to know the column is numeric.
+			candidates.append(0 if NUMERIC_REGEX.match(column) else None)
 		else:
-			col = column
-
-		try:
-			int(col)
-		except (ValueError, TypeError):
-			continue
-		numeric_columns.append(column)
+			candidates.append(column)
+	# Convert all of the candidates at once. Anything that can't be interpreted as a number becomes NaN.
+	is_numeric = pandas.to_numeric(pandas.Series(candidates, dtype = object), errors = 'coerce').notna()
+	numeric_columns = [column for column, numeric in zip(columns, is_numeric.tolist()) if numeric]
 	return numeric_columns
 
 def get_numeric_table(table:pandas.DataFrame)->pandas.DataFrame:
@@ -67,15 +69,33 @@ def get_numeric_table(table:pandas.DataFrame)->pandas.DataFrame:
 
 def map_trajectories_to_genotype(genotype_members: pandas.Series) -> Dict[str, str]:
 	""" Maps each trajectory to the genotype it belongs to."""
-	trajectory_to_genotype = dict()
-	for genotype_label, members in genotype_members.items():
-		for member in members.split('|'):
-			trajectory_to_genotype[member] = genotype_label
+	if genotype_members.empty:
+		return dict()
+	# Split every member string at once. Each trajectory ends up as a value, indexed by the genotype it belongs to.
+	members = genotype_members.str.split('|').explode()
+	# If a trajectory is listed under multiple genotypes, the last one is kept.
+	trajectory_to_genotype = dict(zip(members.tolist(), members.index.tolist()))
 	return trajectory_to_genotype
 
 
+def _is_sorted_numeric_index(index: pandas.Index) -> bool:
+	""" Checks whether the timepoints in `index` are unique numbers given in ascending order."""
+	return pandas.api.types.is_numeric_dtype(index.dtype) and index.is_monotonic_increasing and index.is_unique
+
+
+def get_detection_mask(values: numpy.ndarray, dlimit: float, exclude_fixed: bool = False) -> numpy.ndarray:
+	""" Marks the values which exceed the detection limit. Works with a single trajectory or a table with one trajectory per row.
+		If `exclude_fixed` is True, values above `DETECTION_MASK_FIXED_LIMIT` are considered below the detection limit,
+		even if the detection limit is 0. See `get_valid_points()`.
+	"""
+	detected = values > dlimit
+	if exclude_fixed:
+		detected &= values <= DETECTION_MASK_FIXED_LIMIT
+	return detected
+
+
 def get_valid_points(left_trajectory: pandas.Series, right_trajectory: pandas.Series, dlimit: float, flimit: Optional[float] = None,
-		inner: bool = False) -> Tuple[pandas.Series, pandas.Series]:
+		inner: bool = False, masks: Optional[Tuple[numpy.ndarray, numpy.ndarray]] = None) -> Tuple[pandas.Series, pandas.Series]:
 	"""
 		Filters out timepoints that do not satisfy the detection criteria.
 	Parameters
@@ -85,53 +105,62 @@ def get_valid_points(left_trajectory: pandas.Series, right_trajectory: pandas.Se
 	dlimit: float
 		Removes the timepoint if both points do no exceed this value.
 	flimit: float
-		If given, all points exceeding this value are treated as "undetected".
+		If given, all points exceeding `DETECTION_MASK_FIXED_LIMIT` are treated as "undetected". Only whether this is given matters, not its value.
 	inner: bool; default False
 		If `true`, both points must exceed the detection limit for a given timepoint to be considered valid.
+	masks: Optional[Tuple[numpy.ndarray, numpy.ndarray]]
+		The output of `get_detection_mask()` for each trajectory, if it was already calculated. `dlimit` and `flimit` are
+		ignored when these are given.
 
 	Returns
 	-------
 
 	"""
 
-	if flimit is not None:
-		# Mask the values so they are considered below the detection limit.
-		# Assign a value of -1 so that they will be excluded even if the detection limit is 0.
-		# list comprehension is ~6X faster than mask()
-		left = pandas.Series([(-1 if s > 0.97 else s) for s in left_trajectory.values], index = left_trajectory.index)
-		right = pandas.Series([(-1 if s > 0.97 else s) for s in right_trajectory.values], index = right_trajectory.index)
+	if masks is None:
+		# Compare both series against the detection limit at once rather than timepoint by timepoint.
+		exclude_fixed = flimit is not None
+		left_detected = get_detection_mask(left_trajectory.to_numpy(), dlimit, exclude_fixed)
+		right_detected = get_detection_mask(right_trajectory.to_numpy(), dlimit, exclude_fixed)
 	else:
-		left, right = left_trajectory, right_trajectory
+		left_detected, right_detected = masks
 
 	if inner:
-		# list comprehensions are ~10X faster than using the built-in pandas methods.
-		at_least_one_detected = [(l > dlimit and r > dlimit) for l, r in zip(left.values, right.values)]
+		at_least_one_detected = left_detected & right_detected
 	else:
-		at_least_one_detected = [(l > dlimit or r > dlimit) for l, r in zip(left.values, right.values)]
-	at_least_one_detected = pandas.Series(at_least_one_detected, index = left.index)
+		at_least_one_detected = left_detected | right_detected
 
-	# Remove indicies where the series value falls below the detection limit. This should include the masked fixed values.
-	at_least_one_detected_reduced = at_least_one_detected[at_least_one_detected]
-	if at_least_one_detected_reduced.empty:
+	if not at_least_one_detected.any():
 		# There are no shared timepoints between the series. Assign index_min and index_max to the same number, which will result in an empty dataframe.
 		position_index_min = position_index_max = 0
+	elif _is_sorted_numeric_index(left_trajectory.index):
+		# The usual case. The first and last detected positions are also the earliest and latest detected timepoints,
+		# so there's no need to search the index for them.
+		if at_least_one_detected.all():
+			# Every timepoint is valid, so there is nothing to remove.
+			return left_trajectory, right_trajectory
+		detected_positions = numpy.flatnonzero(at_least_one_detected)
+		position_index_min = int(detected_positions[0])
+		position_index_max = int(detected_positions[-1]) + 1
 	else:
+		# Remove indicies where the series value falls below the detection limit. This should include the masked fixed values.
+		detected_index = left_trajectory.index[at_least_one_detected]
 		# Apparently the min() and max functions now work with strings as well as numbers.
 		# Cast the numbers to float so the typeerror is thrown correctly.
 		try:
-			position_index_min_value = min(at_least_one_detected_reduced.index, key = lambda s: float(s))
-			position_index_max_value = max(at_least_one_detected_reduced.index, key = lambda s: float(s))
+			position_index_min_value = min(detected_index, key = lambda s: float(s))
+			position_index_max_value = max(detected_index, key = lambda s: float(s))
 		except TypeError:
 			# The indicies are str and we can't use min() or max(). Assume the indicies are already sorted.
-			position_index_min_value = at_least_one_detected_reduced.index[0]
-			position_index_max_value = at_least_one_detected_reduced.index[-1]
+			position_index_min_value = detected_index[0]
+			position_index_max_value = detected_index[-1]
 
-		position_index_min = left.index.get_loc(position_index_min_value)
-		position_index_max = left.index.get_loc(position_index_max_value)
+		position_index_min = left_trajectory.index.get_loc(position_index_min_value)
+		position_index_max = left_trajectory.index.get_loc(position_index_max_value)
 		# Since we want to include the last index, increment position_index_max by one.
 		position_index_max += 1
-	result_left = left_trajectory[position_index_min:position_index_max]
-	result_right = right_trajectory[position_index_min:position_index_max]
+	result_left = left_trajectory.iloc[position_index_min:position_index_max]
+	result_right = right_trajectory.iloc[position_index_min:position_index_max]
 
 	return result_left, result_right
 
@@ -139,7 +168,9 @@ def get_valid_points(left_trajectory: pandas.Series, right_trajectory: pandas.Se
 get_detected_points = get_valid_points
 
 
+@functools.lru_cache(maxsize = None)
 def calculate_luminance(color: str) -> float:
+	# Palettes only contain a handful of colors, but the luminance is requested for every annotation and lineage node.
 	# 0.299 * color.R + 0.587 * color.G + 0.114 * color.B
 	red = int(color[1:3], 16)
 	green = int(color[3:5], 16)
@@ -149,49 +180,77 @@ def calculate_luminance(color: str) -> float:
 	return lum / 255
 
 
+def calculate_luminance_batch(colors: Sequence[str]) -> numpy.ndarray:
+	""" Calculates the luminance of each hex color in `colors` at once. The colors should be formatted as '#RRGGBB'."""
+	if not all(isinstance(color, str) and len(color) == 7 and color[0] == '#' for color in colors):
+		# The colors are decoded as a single byte string, so one malformed color would shift the channels of every later color.
+		return numpy.array([calculate_luminance(color) for color in colors], dtype = float)
+	# Decode all of the hex codes in one call rather than parsing each channel of each color separately.
+	rgb = numpy.frombuffer(bytes.fromhex(''.join(color[1:] for color in colors)), dtype = numpy.uint8).reshape(-1, 3)
+	rgb = rgb.astype(float)
+	# Same order of operations as `calculate_luminance` so both give identical values.
+	lum = (.299 * rgb[:, 0]) + (.587 * rgb[:, 1]) + (.114 * rgb[:, 2])
+	return lum / 255
+
+
 def format_inconsistency_matrix(inconsistency_matrix) -> pandas.DataFrame:
-	inconsistency_table = pandas.DataFrame(inconsistency_matrix, columns = ['mean', 'std', 'observations', 'statistic'])
-	inconsistency_table['observations'] = inconsistency_table['observations'].astype(int)
+	# Assign each column with its final type rather than casting the `observations` column after the table is built.
+	inconsistency_matrix = numpy.asarray(inconsistency_matrix, dtype = float)
+	inconsistency_table = pandas.DataFrame({
+		'mean':         inconsistency_matrix[:, 0],
+		'std':          inconsistency_matrix[:, 1],
+		'observations': inconsistency_matrix[:, 2].astype(int),
+		'statistic':    inconsistency_matrix[:, 3]
+	})
 	return inconsistency_table
 
 
 # noinspection PyTypeChecker,PyUnresolvedReferences
 def fixed_immediately(trajectory: pandas.Series, dlimit: float, flimit: float) -> bool:
-	mask1 = (trajectory <= dlimit)
-	mask2 = (trajectory >= flimit)
-	return (mask1.sum() + mask2.sum()) == len(trajectory)
+	values = trajectory.values
+	# Every timepoint has to be either undetected or fixed. Check both conditions in a single mask rather than counting each one separately.
+	return bool(((values <= dlimit) | (values >= flimit)).all())
 
 
 def fixed(trajectory: pandas.Series, flimit: float) -> bool:
 	""" Tests whether the input series fixed at any point.
 		If it throws a ValueError due to being an array, check the input data for duplicate labels
 	"""
-	try:
-		return any(i > flimit for i in trajectory.values)
-	except ValueError:
+	values = trajectory.values
+	if values.ndim != 1:
 		message = "Encountered an error when selecting 'fixed' trajectories. This is usually caused by duplicate trajectory ids in the input table."
 		if isinstance(trajectory, pandas.DataFrame):
 			message += f"\nRename these trajectories: {list(trajectory.index)}"
 		raise ValueError(message)
+	try:
+		return bool((values > flimit).any())
 	except TypeError as exception:
 		logger.warning(f"Trajectory: {trajectory.values}")
 		logger.warning(f"flimit: {flimit}")
 
 		raise exception
 
+def get_intermediate_mask(values: numpy.ndarray, dlimit: float, flimit: float) -> numpy.ndarray:
+	""" Marks the values that are neither undetected nor fixed. Works with a single trajectory or a table with one trajectory per row."""
+	return (values >= dlimit) & (values <= flimit)
+
+def get_fixed_mask(values: numpy.ndarray, flimit: float) -> numpy.ndarray:
+	""" Marks the values that are fixed. Works with a single trajectory or a table with one trajectory per row."""
+	return get_intermediate_mask(values, dlimit = flimit, flimit = FIXED_DUMMY_UPPER_LIMIT)
+
 def get_fixed(trajectory:IterableValues, flimit)->pandas.Series:
 	""" Returns a pandas.Series object with only the timepoints where the series was fixed."""
 	# Usa a dummy value for the `flimit` parameter.
-	result = get_intermediate(trajectory, dlimit = flimit, flimit = 2)
+	result = get_intermediate(trajectory, dlimit = flimit, flimit = FIXED_DUMMY_UPPER_LIMIT)
 	return result
 def get_undetected(trajectory:IterableValues, dlimit:float)->pandas.Series:
-	return get_intermediate(trajectory, dlimit = -2, flimit = dlimit)
+	return get_intermediate(trajectory, dlimit = UNDETECTED_DUMMY_LOWER_LIMIT, flimit = dlimit)
 def get_intermediate(trajectory:IterableValues, dlimit:float, flimit:float)->pandas.Series:
 	""" Tests whether the input series had timepoints that were neither undetected nor fixed.
 		Returns a pandas.Series object with the indecies and values that satisfy this criteria.
 	"""
 	trajectory = _coerce_to_series(trajectory)
-	is_intermediate = trajectory.apply(lambda s: dlimit <= s <= flimit)
+	is_intermediate = get_intermediate_mask(trajectory.values, dlimit, flimit)
 	# remove the timepoints which are undetected or fixed
 	result = trajectory[is_intermediate]
 	return result
@@ -200,8 +259,8 @@ def get_intermediate(trajectory:IterableValues, dlimit:float, flimit:float)->pan
 
 def only_fixed(trajectory: pandas.Series, dlimit: float, flimit: float) -> bool:
 	""" Tests whether the series immediately fixed and stayed fixed."""
-	series = ((i > flimit or i < dlimit) for i in trajectory.values)
-	return all(series)
+	values = trajectory.values
+	return bool(((values > flimit) | (values < dlimit)).all())
 
 def get_first_fixed_timepoint(elements:pandas.Series, flimit:float)->Any:
 	""" Returns the first index that was `fixed` """
@@ -231,43 +290,50 @@ def get_overlap_regions(left:IterableValues, right:IterableValues, flimit:float)
 	return overlapping_regions
 
 def overlap(left: Union[List[float], pandas.Series], right: Union[List[float], pandas.Series], dlimit: float) -> int:
-	result = [(i > dlimit and j > dlimit) for i, j in zip(left.values, right.values)]
-
-	return sum(result)
+	return int(numpy.count_nonzero((left.values > dlimit) & (right.values > dlimit)))
 
 
 # noinspection PyTypeChecker
 def find_boundaries_fixed(trajectory: pandas.Series, flimit: float) -> Optional[Tuple[int, int]]:
-	fixed_series = trajectory[trajectory > flimit]
+	# Find the fixed positions directly rather than building a filtered copy of the series.
+	fixed_positions = numpy.flatnonzero(trajectory.values > flimit)
 	# Assume index is sorted to avoid the situation where the index is str.
-	if fixed_series.empty: return None
+	if len(fixed_positions) == 0: return None
 	else:
-		return fixed_series.index[0], fixed_series.index[-1]
+		return trajectory.index[fixed_positions[0]], trajectory.index[fixed_positions[-1]]
 
 
-def _get_git_log() -> str:
+def _get_git_log(size: int = 4096) -> str:
+	""" Reads the end of the git reflog. Only the most recent entries are needed, so there's no reason to read the whole file."""
 	filename = Path(__file__).parent.parent / ".git" / "logs" / "HEAD"
 	try:
-		contents = filename.read_text()
-	except FileNotFoundError:
-		contents = ""
+		with filename.open('rb') as file:
+			file.seek(0, io.SEEK_END)
+			length = file.tell()
+			file.seek(max(0, length - size))
+			contents = file.read().decode(errors = 'replace')
+	except (FileNotFoundError, NotADirectoryError):
+		# `.git` is a file rather than a folder in worktrees and submodules.
+		return ""
+	if length > size:
+		# The first line was probably cut off.
+		contents = contents.partition('\n')[2]
 	return contents
 
 
+@functools.lru_cache(maxsize = None)
 def get_commit_hash() -> str:
+	# The commit can't change while the program is running, so the log only needs to be read once.
 	commit_hash = "n/a"
 	contents = _get_git_log()
 	if contents:
-		contents = contents.split('\n')
-		contents = [i.strip() for i in contents if i.strip()]
-		reader = csv.reader(contents, delimiter = '\t')
-		for line in reader:
-			if line:
-				hash_string = line[0]
-				try:
-					commit_hash = hash_string.split()[1]
-				except IndexError:
-					continue
+		# The current commit is listed in the last valid entry, so search from the end of the log.
+		for line in reversed(contents.split('\n')):
+			# The first tab-delimited field is '<old hash> <new hash> <author> <timestamp>'
+			fields = line.strip().split('\t')[0].split()
+			if len(fields) > 1:
+				commit_hash = fields[1]
+				break
 		commit_hash = commit_hash[:7]
 	else:
 		commit_hash = "not available"
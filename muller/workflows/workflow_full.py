@@ -438,11 +438,26 @@ def render_graphics(paths: projectpaths.OutputFilenames, data_basic: projectdata
 		filename_palette = paths.filename_palette.with_name(f"palette.{palette_name}.json")
 		current_palette.save(filename_palette)
 
-		for suffix in ["png", "svg"]:
+		# The muller diagrams are only drawn once per palette and then saved as both a png and an svg.
+		suffixes = ["png", "svg"]
+		logger.info("Generating the annotated muller plots...")
+		generator_plot_muller.plot(
+			muller_df = data_ggmuller.table_muller,
+			color_palette = current_palette.get_genotype_palette(),
+			annotations = genotype_annotations,
+			filename = [paths.get_template(folder_palette, paths.template_figure_muller_diagram_annotated, suffix) for suffix in suffixes]
+		)
+		logger.info("Generating the unannotated muller plots...")
+		generator_plot_muller.plot(
+			muller_df = data_ggmuller.table_muller,
+			color_palette = current_palette.get_genotype_palette(),
+			annotations = None,
+			filename = [paths.get_template(folder_palette, paths.template_figure_muller_diagram_unannotated, suffix) for suffix in suffixes]
+		)
+
+		for suffix in suffixes:
 			filename_mullerplot_annotated = paths.get_template(folder_palette,
 				paths.template_figure_muller_diagram_annotated, suffix)
-			filename_mullerplot_unannotated = paths.get_template(folder_palette,
-				paths.template_figure_muller_diagram_unannotated, suffix)
 			filename_timeseries_panel = paths.get_template(folder_palette, paths.template_figure_panel_timeseries,
 				suffix)
 			filename_timeseries_genotypes = paths.get_template(folder_palette,
@@ -475,14 +490,6 @@ def render_graphics(paths: projectpaths.OutputFilenames, data_basic: projectdata
 				filename = filename_timeseries_panel,
 				palette = current_palette,
 			)
-			logger.info("Generating the annotated muller plots...")
-			generator_plot_muller.plot(
-				muller_df = data_ggmuller.table_muller,
-				color_palette = current_palette.get_genotype_palette(),
-				annotations = genotype_annotations,
-				filename = filename_mullerplot_annotated
-			)
-
 			generator_plot_muller_panel.plot(
 				timeseries = data_inference.table_genotypes,
 				muller_df = data_ggmuller.table_muller,
@@ -490,14 +497,6 @@ def render_graphics(paths: projectpaths.OutputFilenames, data_basic: projectdata
 				annotations = genotype_annotations,
 				filename = filename_muller_panel
 			)
-
-			logger.info("Generating the unannotated muller plots...")
-			generator_plot_muller.plot(
-				muller_df = data_ggmuller.table_muller,
-				color_palette = current_palette.get_genotype_palette(),
-				annotations = None,
-				filename = filename_mullerplot_unannotated
-			)
 			logger.info("Generating the lineageplot...")
 			lineageplot = graphics.flowchart(
 				edges = data_ggmuller.series_edges.reset_index(),
@@ -33,7 +33,7 @@ setup(
 	long_description = LONG_DESCRIPTION,
 	long_description_content_type='text/markdown',
 	install_requires = [
-		'pandas>=0.24.0', 'loguru', 'scipy>=1.3.0', 'matplotlib>=3.0.0','graphviz',
+		'pandas>=0.25.0', 'loguru', 'scipy>=1.3.0', 'matplotlib>=3.0.0','graphviz',
 		'pygraphviz', 'seaborn', 'numpy>=1.16.2', 'xlrd', 'shapely>=1.6.4', 'tqdm'
 	],
 	tests_requires = ['pytest'],
@@ -1,5 +1,6 @@
 from pathlib import Path
 from typing import *
+import pandas
 import pytest
 from muller.clustering.metrics import distance_calculator
 
@@ -16,4 +17,54 @@ from muller.clustering.metrics import distance_calculator
 )
 def test_categorize_series(left, right, expected):
 	result = distance_calculator.get_pair_category(left, right, dlimit = 0.03, flimit = 0.90)
-	assert result == expected
\ No newline at end of file
+	assert result == expected
+
+
+@pytest.mark.parametrize(
+	"series, expected",
+	[
+		([0.00, 0.00, 0.00, 1.00, 1.00, 1.00, 1.00], (True, False)),
+		([0.00, 0.01, 0.26, 1.00, 1.00, 1.00, 1.00], (True, True)),
+		([0.00, 0.00, 0.00, 0.18, 0.17, 0.23, 0.24], (False, True)),
+		([0.00, 0.00, 0.00, 0.00, 0.00, 0.00, 0.00], (False, False))
+	]
+)
+def test_get_trajectory_dynamics(series, expected):
+	result = distance_calculator.get_trajectory_dynamics(series, dlimit = 0.03, flimit = 0.90)
+	assert result == expected
+
+
+def test_get_all_trajectory_dynamics():
+	# Include values at exactly the detection limit, exactly the fixed limit, and above 1.
+	trajectories = pandas.DataFrame(
+		[
+			[0.00, 0.03, 0.00, 0.00],
+			[0.00, 0.00, 0.90, 0.00],
+			[0.00, 0.00, 0.00, 1.20],
+			[0.00, 0.00, 0.00, 2.50],
+			[0.00, 0.02, 0.91, 1.00],
+			[0.00, 0.00, 0.00, 0.00]
+		],
+		index = ['at-dlimit', 'at-flimit', 'above-one', 'above-dummy-limit', 'near-limits', 'undetected'],
+		columns = [0, 1, 2, 3]
+	)
+	calculator = distance_calculator.DistanceCalculator(detection_limit = 0.03, fixed_limit = 0.90, metric = 'binomial')
+	calculator.trajectories = trajectories
+	result = calculator.get_all_trajectory_dynamics()
+
+	expected = {
+		label: distance_calculator.get_trajectory_dynamics(series, dlimit = 0.03, flimit = 0.90)
+		for label, series in trajectories.iterrows()
+	}
+	assert result == expected
+
+
+def test_get_detection_masks():
+	# The fixed timepoints are always excluded using `widgets.DETECTION_MASK_FIXED_LIMIT`, not the calculator's fixed limit.
+	trajectories = pandas.DataFrame([[0.00, 0.03, 0.50, 0.95, 0.98]], index = ['trajectory'], columns = [0, 1, 2, 3, 4])
+	calculator = distance_calculator.DistanceCalculator(detection_limit = 0.03, fixed_limit = 0.90, metric = 'binomial')
+	calculator.trajectories = trajectories
+	detected, detected_not_fixed = calculator.get_detection_masks()['trajectory']
+
+	assert detected.tolist() == [False, False, True, True, True]
+	assert detected_not_fixed.tolist() == [False, False, True, True, False]
@@ -54,6 +54,17 @@ def test_pearson_distance(left, right, expected: float):
 	assert pytest.approx(result, rel = 1E-4) == expected
 
 
+def test_pearson_distance_proportional_series():
+	# Rounding error can make the correlation between proportional series slightly larger than 1.
+	left = pandas.Series([0.61, 0.73, 0.54, 0.94, 0.82, 0.0])
+	right = left * 3
+
+	result = distance_methods.pearson_correlation_distance(left, right, adjusted = False)
+	assert result >= 0
+	assert result == 1 - left.corr(right)
+	assert distance_methods.pearson_correlation_distance(left, right) >= 0
+
+
 @pytest.mark.parametrize("left,right",
 	[
 		([0, 0.0, 0.0, 0.273, 0.781, 1.0, 1.0], [0, 0.0, 0.0, 0.0, 0.345, 0.833, 0.793]),
@@ -64,6 +64,14 @@ def test_squareform(small_cache):
 	pandas.testing.assert_frame_equal(expected_df, small_cache.squareform())
 
 
+def test_squareform_asymmetric_values(small_cache):
+	# If the two orientations of a pair disagree, each cell holds the value keyed by (column, row).
+	small_cache.pairwise_values['1', '2'] = .9
+	result = small_cache.squareform()
+	assert result.loc['2', '1'] == .9
+	assert result.loc['1', '2'] == .5
+
+
 def test_asdict(small_cache):
 	expected = {
 		('1', '2'): .5,
@@ -1,3 +1,4 @@
+import random
 import re
 
 import pandas
@@ -61,6 +62,19 @@ def test_generate_random_color():
 	assert re.match("#[0-9A-F]{6}", color)
 
 
+def test_generate_random_colors():
+	colors = palettes.random_colors(20, lower = 50, upper = 51)
+	assert len(colors) == 20
+	assert all(re.match("#(3[23]){3}$", color) for color in colors)
+
+
+def test_generate_random_colors_seeded():
+	random.seed(1)
+	expected = palettes.random_colors(10)
+	random.seed(1)
+	assert palettes.random_colors(10) == expected
+
+
 @pytest.mark.parametrize("rgb,expected",
 	[
 		((247, 252, 253), "#f7fcfd"),
@@ -3,6 +3,8 @@ from typing import List
 import pandas
 import pytest
 import math
+from scipy import stats
+
 from muller.inheritance import scoring
 
 
@@ -61,6 +63,25 @@ def test_calculate_above_fixed_score(scorer, left: List[float], right: List[floa
 	assert result == expected
 
 
+@pytest.mark.parametrize("left,right,expected",
+	[
+		([0, .1, .1, .1, .1, .1, .1], [0, .94, .94, .95, .96, .94, .94], 1),
+		([0, .1, .1, .1, .1, .1, .1], [0, .5, .5, .6, .5, .5, .5], 0)
+	])
+def test_calculate_above_fixed_score_without_detection_limit(left: List[float], right: List[float], expected: int):
+	# A detection limit of 0 means both samples have no variance. scipy returns an infinite statistic rather than raising an error.
+	scorer = scoring.Score(0, 0.97, 0.05, weights = [1, 1, 1, 1])
+	left = pandas.Series(left)
+	right = pandas.Series(right)
+
+	combined = (left + right).tolist()[1:]
+	expected_statistic, expected_pvalue = stats.ttest_ind_from_stats(sum(combined) / len(combined), 0, len(combined), 1, 0, len(combined))
+	statistic, pvalue = scorer._multiple_sample_ttest(left, right)
+	assert (statistic, pvalue) == (expected_statistic, expected_pvalue)
+
+	assert scorer.calculate_score_above_fixed(left, right) == expected
+
+
 @pytest.mark.parametrize(
 	"left,right,expected",
 	[  # nested, unnested, expected_score
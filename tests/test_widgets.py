@@ -48,6 +48,18 @@ def test_get_detected_points(left, right, index):
 	assert list(rl.index) == index
 
 
+def test_get_detected_points_precomputed_masks():
+	left = pandas.Series([0, 0, 0, 0, 0, 1, 1])
+	right = pandas.Series([0, 0, 0, .14, .53, 1, 1])
+	masks = widgets.get_detection_mask(left.values, 0.03, exclude_fixed = True), widgets.get_detection_mask(right.values, 0.03, exclude_fixed = True)
+	assert masks[1].tolist() == [False, False, False, True, True, False, False]
+	assert widgets.get_detection_mask(right.values, 0.03).tolist() == [False, False, False, True, True, True, True]
+
+	result_left, result_right = widgets.get_valid_points(left, right, 0.03, 0.97, masks = masks)
+	expected_left, expected_right = widgets.get_valid_points(left, right, 0.03, 0.97)
+	assert result_left.equals(expected_left) and result_right.equals(expected_right)
+
+
 def test_get_detected_points_advanced():
 	left = pandas.Series([0, 0, 0, 0, 0])
 	right = pandas.Series([0, .14, 0, 1, 1])
@@ -133,7 +145,10 @@ def test_get_commit_hash(filename_mock):
 	expected_hash = "f086ec9"
 
 	filename_mock.return_value = test_file
+	# The hash is cached, so make sure the mocked log is actually read.
+	widgets.get_commit_hash.cache_clear()
 	result_hash = widgets.get_commit_hash()
+	widgets.get_commit_hash.cache_clear()
 
 	assert expected_hash == result_hash
 
@@ -286,3 +301,19 @@ def test_calculate_total_number_of_combinations(elements, size, expected):
 	assert result == expected
 
 
+def test_calculate_luminance_batch():
+	colors = ['#000000', '#FFFFFF', '#66c2a4', '#e5f5f9', '#00441b']
+	result = widgets.calculate_luminance_batch(colors)
+	assert result.tolist() == [widgets.calculate_luminance(color) for color in colors]
+
+
+def test_calculate_luminance_batch_malformed_color():
+	# A color that isn't formatted as '#RRGGBB' shouldn't change the luminance of the other colors.
+	colors = ['#000000', '#FFFFFFAA', '#FFFFFF']
+	result = widgets.calculate_luminance_batch(colors)
+	assert result.tolist() == [widgets.calculate_luminance(color) for color in colors]
+	assert result[-1] == 1
+
+	# Colors that can't be parsed at all raise the same error as `calculate_luminance()`.
+	with pytest.raises(ValueError):
+		widgets.calculate_luminance_batch(['#000000', '#FFF'])